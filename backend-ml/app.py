@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -9,9 +9,28 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 import joblib
 import os
+import gzip
+import hashlib
+import hmac
+import json
+import heapq
+import itertools
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag'])
+
+# Token compartilhado para os endpoints com estado por tenant; sem ele, só chamadas locais
+ML_API_TOKEN = os.environ.get('ML_API_TOKEN')
+
+# Respostas menores que isso não compensam a compressão
+TAMANHO_MINIMO_COMPRESSAO = int(os.environ.get('ML_TAMANHO_MINIMO_COMPRESSAO', 1024))
 
 class FinancialAIAnalyzer:
     """
@@ -451,6 +470,109 @@ class FinancialAIAnalyzer:
         
         return int(min(100, max(0, score)))
     
+    def calculate_health_series_ml(self, df_trans, saldo_atual=0, total_dividas=0):
+        """
+        Série histórica da saúde financeira: o mesmo score de calculate_financial_health_ml
+        avaliado em cada fim de mês, com agregados acumulados sobre a matriz mensal
+        (sem reprocessar o histórico nem retreinar modelos mês a mês)
+        """
+        if df_trans.empty:
+            return []
+        
+        # Índice inteiro do mês de cada transação (0 = primeiro mês do histórico)
+        codigo = (df_trans['data'].dt.year * 12 + df_trans['data'].dt.month - 1).values
+        idx_mes = codigo - codigo.min()
+        num_meses = int(idx_mes.max()) + 1
+        meses = pd.period_range(start=df_trans['data'].min().to_period('M'), periods=num_meses, freq='M')
+        valores = df_trans['valor'].values.astype(float)
+        # Valores nulos ficam fora das somas, como no skipna de .sum()/.std() do pandas
+        valido = ~np.isnan(valores)
+        eh_saida = (df_trans['tipo'] == 'saida').values
+        eh_saida_valida = eh_saida & valido
+        
+        def por_mes(mascara, pesos):
+            return np.bincount(idx_mes[mascara], weights=pesos[mascara], minlength=num_meses)
+        
+        # Fator 1: liquidez acumulada até cada fim de mês
+        entradas = np.cumsum(por_mes((df_trans['tipo'] == 'entrada').values & valido, valores))
+        saidas = np.cumsum(por_mes(eh_saida_valida, valores))
+        score = np.full(len(meses), 50.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            liquidez = np.minimum(25, (entradas - saidas) / entradas * 100)
+        score += np.where(entradas > 0, liquidez, 0)
+        
+        # Fator 2: saldo no fim de cada mês, reconstruído a partir do saldo atual
+        saldos = saldo_atual - ((entradas[-1] - saidas[-1]) - (entradas - saidas))
+        score += np.select(
+            [saldos > 5000, saldos > 2000, saldos > 500, saldos < 0],
+            [15, 10, 5, -20],
+            default=0
+        )
+        
+        # Fator 3: dívidas (só o total atual é conhecido, aplicado a todos os meses)
+        if total_dividas > 0:
+            with np.errstate(divide='ignore'):
+                ratio = total_dividas / saldos
+            score += np.where(
+                saldos > 0,
+                np.select([ratio > 5, ratio > 2, ratio > 1, ratio < 0.5], [-30, -20, -10, 5], default=0),
+                -25 if total_dividas > 10000 else 0
+            )
+        
+        # Fator 4: CV das saídas com soma, soma dos quadrados e contagem acumuladas
+        n = np.cumsum(por_mes(eh_saida_valida, np.ones_like(valores)))
+        soma = np.cumsum(por_mes(eh_saida_valida, valores))
+        soma_q = np.cumsum(por_mes(eh_saida_valida, valores ** 2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            desvio = np.sqrt(np.maximum(0, (soma_q - soma ** 2 / n) / (n - 1)))
+            cv = desvio / (soma / n)
+        score += np.where((n > 1) & np.isfinite(cv), np.maximum(0, 10 - cv * 5), 0)
+        
+        # Fator 5: proporção de categorias com tendência estável/decrescente,
+        # com a inclinação da regressão linear de cada categoria atualizada mês a mês
+        if eh_saida.any():
+            cat_codigos, categorias = pd.factorize(df_trans['categoria'].values[eh_saida])
+            # Saídas sem categoria (código -1) ficam de fora, como em analyze_patterns_ml
+            com_categoria = cat_codigos >= 0
+            celula = cat_codigos[com_categoria] * num_meses + idx_mes[eh_saida][com_categoria]
+            formato = (len(categorias), num_meses)
+            # Um mês só com valores nulos ainda conta para a categoria (soma 0 no groupby)
+            y = np.bincount(celula, weights=np.nan_to_num(valores[eh_saida][com_categoria]),
+                            minlength=formato[0] * num_meses).reshape(formato)
+            observado = np.bincount(celula, minlength=formato[0] * num_meses).reshape(formato) > 0
+            
+            # x = posição do mês entre os meses com gastos da categoria (como em analyze_patterns_ml)
+            k = np.cumsum(observado, axis=1)
+            x = np.where(observado, k - 1, 0)
+            sx = np.cumsum(x, axis=1)
+            sy = np.cumsum(y, axis=1)
+            sxy = np.cumsum(x * y, axis=1)
+            sxx = np.cumsum(x * x, axis=1)
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                inclinacao = (k * sxy - sx * sy) / (k * sxx - sx ** 2)
+                media = sy / k
+            
+            validas = k >= 2
+            crescentes = validas & (inclinacao > media * 0.05)
+            num_validas = validas.sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                proporcao = (num_validas - crescentes.sum(axis=0)) / num_validas
+            score += np.where(num_validas > 0, proporcao * 10, 0)
+        
+        score = np.clip(score, 0, 100).astype(int)
+        
+        return [
+            {
+                'mes': str(mes),
+                'saudeFinanceira': int(score[i]),
+                'saldo': float(saldos[i]),
+                'entradasAcumuladas': float(entradas[i]),
+                'saidasAcumuladas': float(saidas[i])
+            }
+            for i, mes in enumerate(meses)
+        ]
+    
     def analyze_behavior(self, df_trans):
         """Análise de comportamento usando apenas transações de caixa"""
         comportamento = {
@@ -495,63 +617,342 @@ class FinancialAIAnalyzer:
         
         return comportamento
 
+def calcular_fingerprint(data):
+    """
+    Fingerprint do conteúdo de entrada, usado como ETag
+    Inclui o mês corrente porque os rótulos de previsaoFluxoCaixa dependem de datetime.now()
+    """
+    conteudo = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256(conteudo.encode('utf-8'))
+    digest.update(datetime.now().strftime('%Y-%m').encode('ascii'))
+    return digest.hexdigest()[:32]
+
+def nao_modificado(etag):
+    """
+    Resposta 304 quando o cliente já tem a versão atual (If-None-Match)
+    O curinga `*` só vale em GET; em POST apenas ETags explícitas são comparadas
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag and request.method != 'GET':
+        return None
+    if etag and if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+def executar_analise(data):
+    """Executa a análise completa e retorna o resultado no formato ResultadoAnaliseML"""
+    transacoes = data.get('transacoes', [])
+    dividas_data = data.get('dividas', [])
+    saldo_atual = data.get('saldo_atual', 0)
+    total_dividas = data.get('total_dividas', 0)
+    
+    # Inicializar analisador
+    analyzer = FinancialAIAnalyzer()
+    
+    # Preparar DataFrames
+    df_trans, df_dividas = analyzer.prepare_dataframe(transacoes, dividas_data)
+    
+    # Análises
+    padroes = analyzer.analyze_patterns_ml(df_trans)
+    insights = analyzer.generate_insights_ml(df_trans, padroes, saldo_atual, total_dividas, df_dividas)
+    previsao_fluxo = analyzer.predict_cash_flow_ml(df_trans)
+    saude = analyzer.calculate_financial_health_ml(df_trans, padroes, saldo_atual, total_dividas)
+    historico_saude = analyzer.calculate_health_series_ml(df_trans, saldo_atual, total_dividas)
+    comportamento = analyzer.analyze_behavior(df_trans)
+    
+    # Recomendações baseadas em regras - foco em caixa e dívidas
+    recomendacoes = []
+    
+    if total_dividas > saldo_atual * 2:
+        recomendacoes.append('🚨 Dívidas críticas! Priorize quitação de débitos vencidos.')
+        recomendacoes.append('💡 Renegocie prazos e busque reduzir juros.')
+    
+    if saude < 40:
+        recomendacoes.append('📉 Saúde financeira crítica. Reduza saídas imediatas.')
+        recomendacoes.append('💰 Foque em aumentar entradas e controlar fluxo de caixa.')
+    elif saude < 70:
+        recomendacoes.append('📊 Monitore categorias com maior crescimento de saídas.')
+        recomendacoes.append('🎯 Busque equilibrar entradas e saídas mensais.')
+    else:
+        recomendacoes.append('✅ Ótima gestão financeira! Continue monitorando o caixa.')
+        if saldo_atual > total_dividas * 2:
+            recomendacoes.append('💎 Considere quitar dívidas antecipadamente ou investir excedente.')
+    
+    if len([p for p in padroes if p['tendencia'] == 'crescente']) > 3:
+        recomendacoes.append('📈 Múltiplas categorias crescendo. Avalie sustentabilidade.')
+    
+    recomendacoes.append('💼 Mantenha reserva de emergência (3 meses de gastos).')
+    
+    return {
+        'padroesPorCategoria': padroes,
+        'insights': insights,
+        'previsaoFluxoCaixa': previsao_fluxo,
+        'analiseComportamento': comportamento,
+        'saudeFinanceira': saude,
+        'historicoSaudeFinanceira': historico_saude,
+        'recomendacoes': recomendacoes[:6],
+        'sucesso': True
+    }
+
+class AnalysisScheduler:
+    """
+    Agendador de análises em segundo plano
+    Recalcula a análise de cada tenant quando chegam dados novos ou a cada intervalo,
+    guardando o último resultado para leitura imediata pelos dashboards
+    """
+    
+    PRIORIDADE_ATIVA = 0    # Tenant com dashboard aberto
+    PRIORIDADE_NORMAL = 1   # Recalculo por dados novos ou intervalo
+    
+    def __init__(self, max_workers=2, intervalo=3600, janela_ativa=300, max_tenants=100, ttl=86400):
+        self.max_workers = max(1, max_workers)
+        self.intervalo = intervalo
+        self.janela_ativa = janela_ativa
+        self.max_tenants = max(1, max_tenants)
+        self.ttl = ttl
+        
+        self._cond = threading.Condition()
+        self._fila = []          # heap de (prioridade, ordem, tenant_id)
+        self._ordem = itertools.count()
+        self._pendentes = {}     # tenant_id -> menor prioridade enfileirada
+        self._payloads = {}      # tenant_id -> últimos dados recebidos
+        self._resultados = {}    # tenant_id -> último resultado calculado com sucesso
+        self._erros = {}         # tenant_id -> falha do último recálculo (mantém o resultado anterior)
+        self._visualizado = {}   # tenant_id -> último acesso ao dashboard
+        self._acesso = {}        # tenant_id -> última escrita ou leitura (para expiração)
+        self._iniciado = False
+    
+    def _iniciar(self):
+        """Inicia os workers sob demanda (evita threads duplicadas no reloader do Flask)"""
+        if self._iniciado:
+            return
+        self._iniciado = True
+        
+        for i in range(self.max_workers):
+            threading.Thread(target=self._worker, name=f'ml-worker-{i}', daemon=True).start()
+        
+        if self.intervalo > 0:
+            threading.Thread(target=self._relogio, name='ml-intervalo', daemon=True).start()
+    
+    def _prioridade(self, tenant_id):
+        visto = self._visualizado.get(tenant_id)
+        if visto is not None and time.monotonic() - visto < self.janela_ativa:
+            return self.PRIORIDADE_ATIVA
+        return self.PRIORIDADE_NORMAL
+    
+    def _enfileirar(self, tenant_id, prioridade):
+        """Enfileira o tenant; chamadas repetidas só sobem a prioridade (chamar com _cond adquirido)"""
+        atual = self._pendentes.get(tenant_id)
+        if atual is not None and atual <= prioridade:
+            return
+        self._pendentes[tenant_id] = prioridade
+        heapq.heappush(self._fila, (prioridade, next(self._ordem), tenant_id))
+        self._cond.notify()
+    
+    def _remover(self, tenant_id):
+        """Descarta todo o estado do tenant (chamar com _cond adquirido)"""
+        for estado in (self._payloads, self._resultados, self._erros,
+                       self._visualizado, self._acesso, self._pendentes):
+            estado.pop(tenant_id, None)
+    
+    def _guardar(self, tenant_id, data):
+        """
+        Guarda os dados do tenant, expirando os inativos há mais de `ttl` segundos
+        e descartando os menos recentes acima de `max_tenants` (chamar com _cond adquirido)
+        """
+        agora = time.monotonic()
+        if self.ttl > 0:
+            for antigo in [t for t, visto in self._acesso.items() if agora - visto > self.ttl]:
+                self._remover(antigo)
+        
+        self._payloads[tenant_id] = data
+        self._acesso[tenant_id] = agora
+        
+        excesso = len(self._payloads) - self.max_tenants
+        if excesso > 0:
+            for antigo in sorted(self._acesso, key=self._acesso.get)[:excesso]:
+                self._remover(antigo)
+    
+    def submeter(self, tenant_id, data):
+        """Registra dados novos do tenant e agenda o recálculo"""
+        with self._cond:
+            self._iniciar()
+            self._guardar(tenant_id, data)
+            self._enfileirar(tenant_id, self._prioridade(tenant_id))
+    
+    def atualizar(self, tenant_id):
+        """Agenda recálculo sob demanda com os últimos dados do tenant"""
+        with self._cond:
+            if tenant_id not in self._payloads:
+                return False
+            self._iniciar()
+            self._enfileirar(tenant_id, self._prioridade(tenant_id))
+            return True
+    
+    def registrar_resultado(self, tenant_id, data, resultado, fingerprint=None):
+        """Guarda um resultado calculado de forma síncrona (ex.: POST /api/analyze)"""
+        with self._cond:
+            self._guardar(tenant_id, data)
+            self._resultados[tenant_id] = {
+                'resultado': resultado,
+                'atualizadoEm': datetime.now().isoformat(),
+                'fingerprint': fingerprint or calcular_fingerprint(data)
+            }
+            self._erros.pop(tenant_id, None)
+    
+    def ultimo(self, tenant_id):
+        """
+        Retorna (último resultado, última falha) do tenant e marca o dashboard como ativo
+        Um recálculo já na fila passa para a frente
+        """
+        with self._cond:
+            # Só tenants com dados são registrados, para o dicionário não crescer sem limite
+            if tenant_id in self._payloads:
+                self._visualizado[tenant_id] = self._acesso[tenant_id] = time.monotonic()
+                if tenant_id in self._pendentes:
+                    self._enfileirar(tenant_id, self.PRIORIDADE_ATIVA)
+            return self._resultados.get(tenant_id), self._erros.get(tenant_id)
+    
+    def status(self, tenant_id):
+        with self._cond:
+            return {
+                'pendente': tenant_id in self._pendentes,
+                'tamanhoFila': len(self._pendentes)
+            }
+    
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    while not self._fila:
+                        self._cond.wait()
+                    prioridade, _, tenant_id = heapq.heappop(self._fila)
+                    # Entradas duplicadas (prioridade já elevada) são descartadas
+                    if self._pendentes.get(tenant_id) == prioridade:
+                        del self._pendentes[tenant_id]
+                        data = self._payloads[tenant_id]
+                        anterior = self._resultados.get(tenant_id)
+                        falha = self._erros.get(tenant_id)
+                        break
+            
+            # Mesmos dados no mesmo mês: o resultado (ou a falha) guardado continua válido
+            fingerprint = calcular_fingerprint(data)
+            if anterior is not None and anterior['fingerprint'] == fingerprint:
+                continue
+            if falha is not None and falha['fingerprint'] == fingerprint:
+                continue
+            
+            try:
+                resultado = executar_analise(data)
+                erro = None
+            except Exception as e:
+                app.logger.exception('Falha na análise agendada do tenant %s', tenant_id)
+                resultado = None
+                erro = str(e)
+            
+            with self._cond:
+                # Dados mais novos chegaram durante o cálculo: o recálculo já está na fila
+                if self._payloads.get(tenant_id) is not data:
+                    continue
+                
+                agora = datetime.now().isoformat()
+                if erro is None:
+                    self._resultados[tenant_id] = {
+                        'resultado': resultado,
+                        'atualizadoEm': agora,
+                        'fingerprint': fingerprint
+                    }
+                    self._erros.pop(tenant_id, None)
+                else:
+                    # O último resultado válido é mantido; a falha fica registrada à parte
+                    self._erros[tenant_id] = {
+                        'erro': erro,
+                        'falhouEm': agora,
+                        'fingerprint': fingerprint
+                    }
+    
+    def _relogio(self):
+        """Recalcula todos os tenants periodicamente"""
+        while True:
+            time.sleep(self.intervalo)
+            with self._cond:
+                agora = time.monotonic()
+                if self.ttl > 0:
+                    for antigo in [t for t, visto in self._acesso.items() if agora - visto > self.ttl]:
+                        self._remover(antigo)
+                for tenant_id in list(self._payloads):
+                    self._enfileirar(tenant_id, self._prioridade(tenant_id))
+
+scheduler = AnalysisScheduler(
+    max_workers=int(os.environ.get('ML_SCHEDULER_WORKERS', 2)),
+    intervalo=int(os.environ.get('ML_SCHEDULER_INTERVALO', 3600)),
+    janela_ativa=int(os.environ.get('ML_SCHEDULER_JANELA_ATIVA', 300)),
+    max_tenants=int(os.environ.get('ML_SCHEDULER_MAX_TENANTS', 100)),
+    ttl=int(os.environ.get('ML_SCHEDULER_TTL', 86400))
+)
+
+def obter_tenant_id(data=None):
+    """Identifica o tenant pelo header X-Tenant-Id, query string ou corpo da requisição"""
+    tenant_id = request.headers.get('X-Tenant-Id') or request.args.get('tenant_id')
+    if not tenant_id and data:
+        tenant_id = data.get('tenant_id')
+    return str(tenant_id) if tenant_id else None
+
+def acesso_tenant_negado():
+    """
+    Resposta 403 quando o chamador não pode ler/gravar dados por tenant
+    Com ML_API_TOKEN definido exige o header X-Api-Token; sem ele, só aceita chamadas locais
+    """
+    if ML_API_TOKEN:
+        token = request.headers.get('X-Api-Token', '')
+        if hmac.compare_digest(token.encode('utf-8'), ML_API_TOKEN.encode('utf-8')):
+            return None
+    elif request.remote_addr in ('127.0.0.1', '::1'):
+        return None
+    
+    return jsonify({
+        'sucesso': False,
+        'erro': 'Acesso negado aos dados por tenant'
+    }), 403
+
+def tenant_obrigatorio():
+    """Resposta 400 para endpoints que exigem tenant explícito"""
+    return jsonify({
+        'sucesso': False,
+        'erro': 'Informe o tenant (header X-Tenant-Id, ?tenant_id= ou campo tenant_id)'
+    }), 400
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
     """Endpoint principal de análise - apenas caixa e dívidas"""
     try:
         data = request.json
-        transacoes = data.get('transacoes', [])
-        dividas_data = data.get('dividas', [])
-        saldo_atual = data.get('saldo_atual', 0)
-        total_dividas = data.get('total_dividas', 0)
-        
-        # Inicializar analisador
-        analyzer = FinancialAIAnalyzer()
-        
-        # Preparar DataFrames
-        df_trans, df_dividas = analyzer.prepare_dataframe(transacoes, dividas_data)
-        
-        # Análises
-        padroes = analyzer.analyze_patterns_ml(df_trans)
-        insights = analyzer.generate_insights_ml(df_trans, padroes, saldo_atual, total_dividas, df_dividas)
-        previsao_fluxo = analyzer.predict_cash_flow_ml(df_trans)
-        saude = analyzer.calculate_financial_health_ml(df_trans, padroes, saldo_atual, total_dividas)
-        comportamento = analyzer.analyze_behavior(df_trans)
-        
-        # Recomendações baseadas em regras - foco em caixa e dívidas
-        recomendacoes = []
-        
-        if total_dividas > saldo_atual * 2:
-            recomendacoes.append('🚨 Dívidas críticas! Priorize quitação de débitos vencidos.')
-            recomendacoes.append('💡 Renegocie prazos e busque reduzir juros.')
-        
-        if saude < 40:
-            recomendacoes.append('📉 Saúde financeira crítica. Reduza saídas imediatas.')
-            recomendacoes.append('💰 Foque em aumentar entradas e controlar fluxo de caixa.')
-        elif saude < 70:
-            recomendacoes.append('📊 Monitore categorias com maior crescimento de saídas.')
-            recomendacoes.append('🎯 Busque equilibrar entradas e saídas mensais.')
-        else:
-            recomendacoes.append('✅ Ótima gestão financeira! Continue monitorando o caixa.')
-            if saldo_atual > total_dividas * 2:
-                recomendacoes.append('💎 Considere quitar dívidas antecipadamente ou investir excedente.')
-        
-        if len([p for p in padroes if p['tendencia'] == 'crescente']) > 3:
-            recomendacoes.append('📈 Múltiplas categorias crescendo. Avalie sustentabilidade.')
-        
-        recomendacoes.append('💼 Mantenha reserva de emergência (3 meses de gastos).')
-        
-        resultado = {
-            'padroesPorCategoria': padroes,
-            'insights': insights,
-            'previsaoFluxoCaixa': previsao_fluxo,
-            'analiseComportamento': comportamento,
-            'saudeFinanceira': saude,
-            'recomendacoes': recomendacoes[:6],
-            'sucesso': True
-        }
         
-        return jsonify(resultado)
+        # Guardar o resultado de um tenant exige a mesma autorização de /dados
+        tenant_id = obter_tenant_id(data)
+        if tenant_id:
+            negado = acesso_tenant_negado()
+            if negado is not None:
+                return negado
+        
+        etag = calcular_fingerprint(data)
+        
+        # Mesmo conteúdo já entregue ao cliente: não reexecutar a análise
+        response = nao_modificado(etag)
+        if response is not None:
+            return response
+        
+        resultado = executar_analise(data)
+        
+        # Sem tenant explícito o resultado não é guardado (evita misturar dados de clientes)
+        if tenant_id:
+            scheduler.registrar_resultado(tenant_id, data, resultado, etag)
+        
+        response = jsonify(resultado)
+        response.set_etag(etag, weak=True)
+        return response
     
     except Exception as e:
         return jsonify({
@@ -559,6 +960,104 @@ def analyze():
             'erro': str(e)
         }), 500
 
+@app.route('/api/analyze/dados', methods=['POST'])
+def analyze_dados():
+    """Recebe dados novos do tenant e agenda a análise em segundo plano"""
+    try:
+        data = request.json
+        tenant_id = obter_tenant_id(data)
+        if not tenant_id:
+            return tenant_obrigatorio()
+        
+        negado = acesso_tenant_negado()
+        if negado is not None:
+            return negado
+        
+        scheduler.submeter(tenant_id, data)
+        return jsonify({'sucesso': True, 'tenantId': tenant_id, 'agendado': True}), 202
+    
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': str(e)
+        }), 500
+
+@app.route('/api/analyze/latest', methods=['GET'])
+def analyze_latest():
+    """Retorna o último resultado pré-calculado do tenant (?refresh=1 agenda recálculo)"""
+    tenant_id = obter_tenant_id()
+    if not tenant_id:
+        return tenant_obrigatorio()
+    
+    negado = acesso_tenant_negado()
+    if negado is not None:
+        return negado
+    
+    ultimo, falha = scheduler.ultimo(tenant_id)
+    
+    if request.args.get('refresh') in ('1', 'true'):
+        scheduler.atualizar(tenant_id)
+    
+    if ultimo is None:
+        # Nenhum resultado válido: a falha do recálculo vira erro HTTP
+        if falha is not None:
+            return jsonify({
+                'sucesso': False,
+                'erro': falha['erro'],
+                'falhouEm': falha['falhouEm'],
+                'tenantId': tenant_id,
+                **scheduler.status(tenant_id)
+            }), 500
+        
+        return jsonify({
+            'sucesso': False,
+            'erro': 'Nenhuma análise disponível para este tenant',
+            'tenantId': tenant_id,
+            **scheduler.status(tenant_id)
+        }), 404
+    
+    status = scheduler.status(tenant_id)
+    estado = {
+        'atualizadoEm': ultimo['atualizadoEm'],
+        'erroAtualizacao': falha['erro'] if falha is not None else None,
+        'tenantId': tenant_id,
+        'pendente': status['pendente']
+    }
+    # O validador cobre só o estado do próprio tenant: quem acompanha um ?refresh=1 vê
+    # pendente/atualizadoEm mudarem, e a fila de outros tenants não invalida o cache
+    etag = calcular_fingerprint({'fingerprint': ultimo['fingerprint'], **estado})
+    
+    response = nao_modificado(etag)
+    if response is not None:
+        return response
+    
+    response = jsonify({**ultimo['resultado'], **estado, 'tamanhoFila': status['tamanhoFila']})
+    response.set_etag(etag, weak=True)
+    return response
+
+@app.after_request
+def comprimir_resposta(response):
+    """Comprime respostas JSON grandes com brotli ou gzip, conforme o Accept-Encoding do cliente"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    corpo = response.get_data()
+    if len(corpo) < TAMANHO_MINIMO_COMPRESSAO:
+        return response
+    
+    aceitos = request.accept_encodings
+    if brotli is not None and aceitos['br']:
+        response.set_data(brotli.compress(corpo, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif aceitos['gzip']:
+        response.set_data(gzip.compress(corpo, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    
+    return response
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check"""
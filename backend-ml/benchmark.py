@@ -0,0 +1,106 @@
+# Benchmark - Backend ML
+# Mede bytes e latência de /api/analyze: resposta completa, comprimida e revalidação (304)
+# Execute com: python benchmark.py [--tamanhos 200 2000] [--repeticoes 5]
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app import app, brotli
+
+CATEGORIAS_SAIDA = ['Material', 'Mão de Obra', 'Aluguel', 'Transporte', 'Alimentação', 'Contas', 'Diversos']
+
+def gerar_payload(num_transacoes, seed=42, meses=12):
+    """Gera um livro-caixa sintético no formato esperado por /api/analyze"""
+    rng = random.Random(seed)
+    hoje = datetime.now()
+    transacoes = []
+
+    for i in range(num_transacoes):
+        tipo = 'entrada' if rng.random() < 0.3 else 'saida'
+        transacoes.append({
+            'id': i,
+            'tipo': tipo,
+            'valor': round(rng.uniform(2000, 15000) if tipo == 'entrada' else rng.lognormvariate(6.5, 0.8), 2),
+            'data': (hoje - timedelta(days=rng.randint(0, meses * 30))).strftime('%Y-%m-%d'),
+            'categoria': 'Receitas' if tipo == 'entrada' else rng.choice(CATEGORIAS_SAIDA),
+            'descricao': f'Transação {i}'
+        })
+
+    dividas = [
+        {'id': 'div-1', 'nome': 'Fornecedor', 'valor': 8000, 'valorRestante': 5000,
+         'vencimento': (hoje + timedelta(days=15)).strftime('%Y-%m-%d'), 'status': 'ativa'}
+    ]
+
+    entradas = sum(t['valor'] for t in transacoes if t['tipo'] == 'entrada')
+    saidas = sum(t['valor'] for t in transacoes if t['tipo'] == 'saida')
+
+    return {
+        'transacoes': transacoes,
+        'dividas': dividas,
+        'saldo_atual': round(entradas - saidas, 2),
+        'total_dividas': 5000
+    }
+
+def medir(client, payload, headers, repeticoes):
+    """Executa a requisição várias vezes e retorna (status, bytes, latências em ms)"""
+    latencias = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        response = client.post('/api/analyze', json=payload, headers=headers)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return response, len(response.get_data()), latencias
+
+def benchmark(tamanhos, repeticoes):
+    client = app.test_client()
+    resultados = []
+
+    for tamanho in tamanhos:
+        payload = gerar_payload(tamanho)
+
+        casos = [('completo', {'Accept-Encoding': 'identity'}), ('gzip', {'Accept-Encoding': 'gzip'})]
+        if brotli is not None:
+            casos.append(('br', {'Accept-Encoding': 'br'}))
+
+        response, _, _ = medir(client, payload, {}, 1)
+        etag = response.headers.get('ETag')
+        casos.append(('304', {'If-None-Match': etag, 'Accept-Encoding': 'gzip'}))
+
+        for nome, headers in casos:
+            response, num_bytes, latencias = medir(client, payload, headers, repeticoes)
+            resultados.append({
+                'transacoes': tamanho,
+                'caso': nome,
+                'status': response.status_code,
+                'bytes': num_bytes,
+                'latenciaMedianaMs': round(statistics.median(latencias), 2)
+            })
+
+    return resultados
+
+def imprimir(resultados):
+    print(f"{'transações':>11} {'caso':>9} {'status':>6} {'bytes':>9} {'economia':>9} {'mediana':>11}")
+    base = {}
+    for r in resultados:
+        if r['caso'] == 'completo':
+            base[r['transacoes']] = r
+        ref = base[r['transacoes']]
+        economia = (1 - r['bytes'] / ref['bytes']) * 100 if ref['bytes'] else 0
+        print(f"{r['transacoes']:>11} {r['caso']:>9} {r['status']:>6} {r['bytes']:>9} "
+              f"{economia:>8.1f}% {r['latenciaMedianaMs']:>9.2f}ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de /api/analyze (ETag, 304 e compressão)')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[200, 2000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='Imprime os resultados em JSON')
+    args = parser.parse_args()
+
+    resultados = benchmark(args.tamanhos, args.repeticoes)
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        imprimir(resultados)
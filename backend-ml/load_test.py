@@ -0,0 +1,304 @@
+# Teste de Carga - Backend ML
+# Replays de livros-caixa sintéticos contra uma instância local de /api/analyze
+# Execute com: python load_test.py --transacoes 500 --concorrencia 8 --requisicoes 200
+#          ou: python load_test.py --taxa 5 --duracao 60 --saida resultado.json
+
+import argparse
+import gzip
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmark import gerar_payload
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def iniciar_servidor(porta, timeout=60):
+    """Inicia o app em um processo separado (sem debug/reloader) e aguarda o /health"""
+    codigo = f"from app import app; app.run(host='127.0.0.1', port={porta}, threaded=True)"
+    processo = subprocess.Popen(
+        [sys.executable, '-c', codigo],
+        cwd=DIRETORIO,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    url = f'http://127.0.0.1:{porta}'
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f'Servidor encerrou ao iniciar (código {processo.returncode})')
+        try:
+            with urllib.request.urlopen(f'{url}/health', timeout=1):
+                return processo, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+
+    processo.terminate()
+    raise RuntimeError('Servidor não respondeu ao /health a tempo')
+
+class MonitorProcesso:
+    """Amostra CPU e RSS do processo do servidor (psutil, ou /proc no Linux)"""
+
+    def __init__(self, pid, intervalo=0.2):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.amostras_rss = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._processo = psutil.Process(pid) if psutil is not None else None
+
+    def disponivel(self):
+        return self._ler() is not None
+
+    def _ler(self):
+        """Retorna (segundos de CPU, RSS em bytes) ou None se não suportado"""
+        try:
+            if self._processo is not None:
+                cpu = self._processo.cpu_times()
+                return cpu.user + cpu.system, self._processo.memory_info().rss
+            with open(f'/proc/{self.pid}/stat') as f:
+                campos = f.read().rsplit(')', 1)[1].split()
+            cpu = (int(campos[11]) + int(campos[12])) / os.sysconf('SC_CLK_TCK')
+            with open(f'/proc/{self.pid}/statm') as f:
+                rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            return cpu, rss
+        except Exception:
+            return None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            leitura = self._ler()
+            if leitura is not None:
+                self.amostras_rss.append(leitura[1])
+
+    def iniciar(self):
+        self._inicio = self._ler()
+        self._inicio_wall = time.monotonic()
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        fim = self._ler()
+        if self._inicio is None or fim is None:
+            return None
+
+        duracao = time.monotonic() - self._inicio_wall
+        rss = self.amostras_rss + [self._inicio[1], fim[1]]
+        return {
+            'cpuSegundos': round(fim[0] - self._inicio[0], 3),
+            'cpuPercentMedio': round((fim[0] - self._inicio[0]) / duracao * 100, 1) if duracao > 0 else 0,
+            'rssInicialMb': round(self._inicio[1] / 2**20, 1),
+            'rssFinalMb': round(fim[1] / 2**20, 1),
+            'rssPicoMb': round(max(rss) / 2**20, 1)
+        }
+
+def enviar(url, corpo):
+    """POST em /api/analyze; retorna (status, bytes trafegados, erro)"""
+    req = urllib.request.Request(
+        f'{url}/api/analyze',
+        data=corpo,
+        headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            dados = response.read()
+            num_bytes = len(dados)
+            if response.headers.get('Content-Encoding') == 'gzip':
+                dados = gzip.decompress(dados)
+            if not json.loads(dados).get('sucesso'):
+                return response.status, num_bytes, 'sucesso=false'
+            return response.status, num_bytes, None
+    except urllib.error.HTTPError as e:
+        return e.code, 0, f'HTTP {e.code}'
+    except Exception as e:
+        return None, 0, type(e).__name__
+
+def percentil(valores, p):
+    """Percentil com interpolação linear (valores já ordenados)"""
+    if not valores:
+        return None
+    k = (len(valores) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (k - inferior)
+
+def executar_carga(url, corpos, concorrencia, requisicoes=None, duracao=None, taxa=None):
+    """
+    Dispara a carga e coleta latências
+    - Sem taxa: carga fechada, `concorrencia` clientes enviando em sequência
+    - Com taxa: carga aberta, chegadas em req/s com no máximo `concorrencia` em voo;
+      a latência conta a partir do horário agendado (inclui espera na fila)
+    """
+    registros = []
+    lock = threading.Lock()
+    inicio = time.monotonic()
+
+    def continuar(i):
+        if requisicoes is not None and i >= requisicoes:
+            return False
+        if duracao is not None and time.monotonic() - inicio >= duracao:
+            return False
+        return True
+
+    def disparar(i, agendado):
+        status, num_bytes, erro = enviar(url, corpos[i % len(corpos)])
+        with lock:
+            registros.append({
+                'latenciaMs': (time.monotonic() - agendado) * 1000,
+                'status': status,
+                'bytes': num_bytes,
+                'erro': erro
+            })
+
+    if taxa:
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            i = 0
+            while continuar(i):
+                agendado = inicio + i / taxa
+                espera = agendado - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                executor.submit(disparar, i, agendado)
+                i += 1
+    else:
+        contador = iter(range(sys.maxsize))
+
+        def cliente():
+            while True:
+                with lock:
+                    i = next(contador)
+                if not continuar(i):
+                    return
+                disparar(i, time.monotonic())
+
+        threads = [threading.Thread(target=cliente) for _ in range(concorrencia)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return registros, time.monotonic() - inicio
+
+def resumir(registros, duracao):
+    latencias = sorted(r['latenciaMs'] for r in registros)
+    erros = [r for r in registros if r['erro']]
+    tipos_erro = {}
+    for r in erros:
+        tipos_erro[r['erro']] = tipos_erro.get(r['erro'], 0) + 1
+
+    return {
+        'requisicoes': len(registros),
+        'erros': len(erros),
+        'taxaErro': round(len(erros) / len(registros), 4) if registros else 0,
+        'tiposErro': tipos_erro,
+        'duracaoSegundos': round(duracao, 3),
+        'throughputRps': round(len(registros) / duracao, 3) if duracao > 0 else 0,
+        'latenciaMs': {
+            'media': round(sum(latencias) / len(latencias), 2) if latencias else None,
+            'p50': round(percentil(latencias, 50), 2) if latencias else None,
+            'p95': round(percentil(latencias, 95), 2) if latencias else None,
+            'p99': round(percentil(latencias, 99), 2) if latencias else None,
+            'max': round(latencias[-1], 2) if latencias else None
+        },
+        'bytesMedioResposta': round(sum(r['bytes'] for r in registros) / len(registros)) if registros else 0
+    }
+
+def versao_git():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRETORIO, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga de /api/analyze')
+    parser.add_argument('--url', help='Usar servidor já em execução (ex.: http://localhost:5000) em vez de iniciar um local')
+    parser.add_argument('--pid', type=int, help='PID do servidor externo para medir CPU/RSS (com --url)')
+    parser.add_argument('--transacoes', type=int, default=500, help='Transações por livro-caixa sintético')
+    parser.add_argument('--ledgers', type=int, default=10, help='Quantidade de livros-caixa distintos (alternados)')
+    parser.add_argument('--concorrencia', type=int, default=4, help='Clientes simultâneos (ou máximo em voo com --taxa)')
+    parser.add_argument('--taxa', type=float, help='Taxa de chegada em req/s (carga aberta)')
+    parser.add_argument('--requisicoes', type=int, help='Total de requisições (padrão: 100 se --duracao não for informado)')
+    parser.add_argument('--duracao', type=float, help='Duração da carga em segundos')
+    parser.add_argument('--aquecimento', type=int, default=2, help='Requisições de aquecimento (não contabilizadas)')
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    if args.requisicoes is None and args.duracao is None:
+        args.requisicoes = 100
+
+    corpos = [json.dumps(gerar_payload(args.transacoes, seed=i)).encode('utf-8') for i in range(args.ledgers)]
+
+    processo = None
+    if args.url:
+        url, pid = args.url.rstrip('/'), args.pid
+    else:
+        processo, url = iniciar_servidor(porta_livre())
+        pid = processo.pid
+
+    try:
+        for i in range(args.aquecimento):
+            enviar(url, corpos[i % len(corpos)])
+
+        monitor = MonitorProcesso(pid) if pid else None
+        if monitor is not None:
+            monitor.iniciar()
+
+        registros, duracao = executar_carga(
+            url, corpos, args.concorrencia,
+            requisicoes=args.requisicoes, duracao=args.duracao, taxa=args.taxa
+        )
+        servidor = monitor.parar() if monitor is not None else None
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    resultado = {
+        'geradoEm': datetime.now().isoformat(),
+        'versao': versao_git(),
+        'config': {
+            'transacoesPorLedger': args.transacoes,
+            'ledgers': args.ledgers,
+            'concorrencia': args.concorrencia,
+            'taxaRps': args.taxa,
+            'modo': 'aberto' if args.taxa else 'fechado',
+            'requisicoes': args.requisicoes,
+            'duracao': args.duracao,
+            'servidorLocal': processo is not None
+        },
+        'resultado': resumir(registros, duracao),
+        'servidor': servidor
+    }
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(saida)
+    else:
+        print(saida)
+
+if __name__ == '__main__':
+    main()
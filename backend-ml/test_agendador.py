@@ -0,0 +1,183 @@
+# Teste do Agendador - Backend ML
+# Cobre /api/analyze/dados, /api/analyze/latest e o AnalysisScheduler com app.test_client()
+# Execute com: python test_agendador.py  (ou pytest test_agendador.py)
+
+import heapq
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+import app as app_module
+from app import AnalysisScheduler, app
+from benchmark import gerar_payload
+
+warnings.filterwarnings('ignore')
+
+PAYLOAD_INVALIDO = {'transacoes': [{'tipo': 'saida'}]}  # sem 'data': a análise falha
+
+def novo_agendador(**kwargs):
+    """Substitui o agendador global por um novo, sem estado de outros testes"""
+    kwargs.setdefault('intervalo', 0)
+    app_module.scheduler = AnalysisScheduler(**kwargs)
+    return app_module.scheduler
+
+@contextmanager
+def analise_simulada(funcao):
+    """Troca executar_analise (chamada pelos workers e por /api/analyze) por `funcao`"""
+    original = app_module.executar_analise
+    app_module.executar_analise = funcao
+    try:
+        yield
+    finally:
+        app_module.executar_analise = original
+
+def aguardar(condicao, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.05)
+    return False
+
+def ultimo(client, tenant_id, **kwargs):
+    return client.get(f'/api/analyze/latest?tenant_id={tenant_id}', **kwargs)
+
+def concluido(client, tenant_id):
+    return lambda: not ultimo(client, tenant_id).get_json().get('pendente', True)
+
+def test_dados_e_latest():
+    novo_agendador()
+    client = app.test_client()
+
+    assert ultimo(client, 't1').status_code == 404
+    response = client.post('/api/analyze/dados', json=gerar_payload(60), headers={'X-Tenant-Id': 't1'})
+    assert response.status_code == 202
+
+    assert aguardar(lambda: ultimo(client, 't1').status_code == 200)
+    resultado = ultimo(client, 't1').get_json()
+    assert resultado['sucesso'] and resultado['tenantId'] == 't1'
+    assert resultado['atualizadoEm'] and resultado['erroAtualizacao'] is None
+
+def test_tenant_obrigatorio():
+    agendador = novo_agendador()
+    client = app.test_client()
+    payload = gerar_payload(30)
+
+    assert client.post('/api/analyze/dados', json=payload).status_code == 400
+    assert client.get('/api/analyze/latest').status_code == 400
+    assert client.post('/api/analyze', json=payload).status_code == 200
+    assert not agendador._payloads
+
+def test_acesso_restrito():
+    novo_agendador()
+    client = app.test_client()
+    remoto = {'REMOTE_ADDR': '10.0.0.5'}
+    payload = gerar_payload(30)
+
+    # Sem token configurado: só chamadas locais
+    assert client.post('/api/analyze/dados', json=payload, headers={'X-Tenant-Id': 't1'},
+                       environ_base=remoto).status_code == 403
+    assert client.get('/api/analyze/latest?tenant_id=t1', environ_base=remoto).status_code == 403
+    assert client.post('/api/analyze', json={**payload, 'tenant_id': 't1'},
+                       environ_base=remoto).status_code == 403
+    # A análise sem tenant continua sem estado e liberada
+    assert client.post('/api/analyze', json=payload, environ_base=remoto).status_code == 200
+
+    original = app_module.ML_API_TOKEN
+    app_module.ML_API_TOKEN = 'segredo'
+    try:
+        assert client.get('/api/analyze/latest?tenant_id=t1', environ_base=remoto,
+                          headers={'X-Api-Token': 'errado'}).status_code == 403
+        assert client.get('/api/analyze/latest?tenant_id=t1').status_code == 403
+        assert client.get('/api/analyze/latest?tenant_id=t1', environ_base=remoto,
+                          headers={'X-Api-Token': 'segredo'}).status_code == 404
+    finally:
+        app_module.ML_API_TOKEN = original
+
+def test_falha_sem_resultado_anterior():
+    novo_agendador()
+    client = app.test_client()
+
+    client.post('/api/analyze/dados', json=PAYLOAD_INVALIDO, headers={'X-Tenant-Id': 'ruim'})
+    assert aguardar(lambda: ultimo(client, 'ruim').status_code == 500)
+    resultado = ultimo(client, 'ruim').get_json()
+    assert not resultado['sucesso'] and resultado['erro']
+
+def test_falha_mantem_ultimo_resultado():
+    novo_agendador()
+    client = app.test_client()
+
+    client.post('/api/analyze/dados', json=gerar_payload(60), headers={'X-Tenant-Id': 't1'})
+    assert aguardar(lambda: ultimo(client, 't1').status_code == 200)
+    anterior = ultimo(client, 't1').get_json()
+
+    client.post('/api/analyze/dados', json=PAYLOAD_INVALIDO, headers={'X-Tenant-Id': 't1'})
+    assert aguardar(lambda: ultimo(client, 't1').get_json()['erroAtualizacao'] is not None)
+    response = ultimo(client, 't1')
+    assert response.status_code == 200
+    resultado = response.get_json()
+    assert resultado['sucesso']
+    assert resultado['saudeFinanceira'] == anterior['saudeFinanceira']
+    assert resultado['atualizadoEm'] == anterior['atualizadoEm']
+
+def test_visualizacao_adianta_recalculo_na_fila():
+    # Workers não são iniciados: a fila é inspecionada diretamente
+    agendador = AnalysisScheduler(intervalo=0)
+    with agendador._cond:
+        for tenant_id in ('a', 'b', 'c'):
+            agendador._guardar(tenant_id, {})
+            agendador._enfileirar(tenant_id, agendador.PRIORIDADE_NORMAL)
+
+    agendador.ultimo('c')
+    assert heapq.nsmallest(1, agendador._fila)[0][2] == 'c'
+    assert agendador._pendentes['c'] == agendador.PRIORIDADE_ATIVA
+
+    # Tenants sem dados não são registrados
+    agendador.ultimo('desconhecido')
+    assert 'desconhecido' not in agendador._visualizado
+
+def test_resultado_obsoleto_descartado():
+    agendador = novo_agendador(max_workers=2)
+    client = app.test_client()
+    liberar = threading.Event()
+    em_execucao = threading.Event()
+
+    def analise(data):
+        if data['marca'] == 'antigo':
+            em_execucao.set()
+            liberar.wait(10)
+        return {'sucesso': True, 'marca': data['marca']}
+
+    with analise_simulada(analise):
+        client.post('/api/analyze/dados', json={'marca': 'antigo'}, headers={'X-Tenant-Id': 't1'})
+        assert em_execucao.wait(10)
+        client.post('/api/analyze/dados', json={'marca': 'novo'}, headers={'X-Tenant-Id': 't1'})
+        assert aguardar(lambda: ultimo(client, 't1').status_code == 200)
+        liberar.set()
+        assert aguardar(concluido(client, 't1'))
+        time.sleep(0.2)
+
+        assert ultimo(client, 't1').get_json()['marca'] == 'novo'
+        assert agendador._resultados['t1']['resultado']['marca'] == 'novo'
+
+def test_limite_e_expiracao_de_tenants():
+    agendador = AnalysisScheduler(intervalo=0, max_tenants=2, ttl=60)
+    with agendador._cond:
+        for tenant_id in ('a', 'b', 'c'):
+            agendador._guardar(tenant_id, {})
+    assert set(agendador._payloads) == {'b', 'c'}
+
+    agendador._acesso['b'] -= 120
+    with agendador._cond:
+        agendador._guardar('d', {})
+    assert set(agendador._payloads) == {'c', 'd'}
+    assert 'b' not in agendador._acesso
+
+if __name__ == '__main__':
+    print("🚀 Teste do Agendador de Análises")
+    print("=" * 60)
+    for nome, teste in list(globals().items()):
+        if nome.startswith('test_'):
+            teste()
+            print(f"✅ {nome}")
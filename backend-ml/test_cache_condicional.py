@@ -0,0 +1,115 @@
+# Teste de Cache Condicional e Compressão - Backend ML
+# Cobre ETag/If-None-Match e gzip em /api/analyze e /api/analyze/latest com app.test_client()
+# Execute com: python test_cache_condicional.py  (ou pytest test_cache_condicional.py)
+
+import gzip
+import json
+import threading
+import warnings
+
+import app as app_module
+from app import app
+from benchmark import gerar_payload
+from test_agendador import aguardar, analise_simulada, concluido, novo_agendador, ultimo
+
+warnings.filterwarnings('ignore')
+
+def test_post_304_com_etag_explicita():
+    client = app.test_client()
+    payload = gerar_payload(60)
+
+    response = client.post('/api/analyze', json=payload)
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and etag.startswith('W/')
+
+    response = client.post('/api/analyze', json=payload, headers={'If-None-Match': etag})
+    assert response.status_code == 304 and not response.get_data()
+
+    # Dados diferentes: nova análise
+    outro = gerar_payload(60, seed=7)
+    assert client.post('/api/analyze', json=outro, headers={'If-None-Match': etag}).status_code == 200
+
+def test_post_ignora_curinga():
+    chamadas = []
+
+    def analise(data):
+        chamadas.append(data)
+        return {'sucesso': True}
+
+    with analise_simulada(analise):
+        response = app.test_client().post('/api/analyze', json=gerar_payload(10), headers={'If-None-Match': '*'})
+    assert response.status_code == 200
+    assert len(chamadas) == 1
+
+def test_latest_304_e_validador_apos_refresh():
+    novo_agendador()
+    client = app.test_client()
+    liberar = threading.Event()
+
+    def analise(data):
+        if data.get('marca') == 'novo':
+            liberar.wait(10)
+        return {'sucesso': True, 'marca': data.get('marca')}
+
+    with analise_simulada(analise):
+        client.post('/api/analyze/dados', json={'marca': 'antigo'}, headers={'X-Tenant-Id': 't1'})
+        assert aguardar(concluido(client, 't1'))
+
+        etag = ultimo(client, 't1').headers['ETag']
+        assert ultimo(client, 't1', headers={'If-None-Match': etag}).status_code == 304
+
+        # Recálculo em andamento: pendente muda, então o validador muda
+        client.post('/api/analyze/dados', json={'marca': 'novo'}, headers={'X-Tenant-Id': 't1'})
+        response = ultimo(client, 't1', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and response.get_json()['pendente']
+        etag_pendente = response.headers['ETag']
+
+        liberar.set()
+        assert aguardar(concluido(client, 't1'))
+        response = ultimo(client, 't1', headers={'If-None-Match': etag_pendente})
+        assert response.status_code == 200
+        assert response.get_json()['marca'] == 'novo'
+        assert response.headers['ETag'] not in (etag, etag_pendente)
+
+def test_latest_validador_ignora_fila_de_outros_tenants():
+    agendador = novo_agendador()
+    client = app.test_client()
+
+    with analise_simulada(lambda data: {'sucesso': True}):
+        client.post('/api/analyze/dados', json={'marca': 1}, headers={'X-Tenant-Id': 't1'})
+        assert aguardar(concluido(client, 't1'))
+        etag = ultimo(client, 't1').headers['ETag']
+
+        # Outro tenant na fila (workers não pegam: a fila é manipulada diretamente)
+        with agendador._cond:
+            agendador._guardar('t2', {})
+            agendador._pendentes['t2'] = agendador.PRIORIDADE_NORMAL
+
+        assert ultimo(client, 't1').get_json()['tamanhoFila'] == 1
+        assert ultimo(client, 't1', headers={'If-None-Match': etag}).status_code == 304
+
+def test_gzip_acima_do_limite():
+    client = app.test_client()
+    payload = gerar_payload(200)
+
+    response = client.post('/api/analyze', json=payload, headers={'Accept-Encoding': 'gzip'})
+    assert len(gzip.decompress(response.get_data())) >= app_module.TAMANHO_MINIMO_COMPRESSAO
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data()))['sucesso']
+
+    response = client.post('/api/analyze', json=payload, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_sem_compressao_abaixo_do_limite():
+    response = app.test_client().get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.get_data()) < app_module.TAMANHO_MINIMO_COMPRESSAO
+    assert 'Content-Encoding' not in response.headers
+
+if __name__ == '__main__':
+    print("🚀 Teste de Cache Condicional e Compressão")
+    print("=" * 60)
+    for nome, teste in list(globals().items()):
+        if nome.startswith('test_'):
+            teste()
+            print(f"✅ {nome}")
@@ -0,0 +1,99 @@
+# Teste de Regressão - Histórico de Saúde Financeira
+# Compara calculate_health_series_ml com o cálculo completo refeito mês a mês
+# Execute com: python test_saude_historico.py  (ou pytest test_saude_historico.py)
+
+import json
+import math
+import random
+import warnings
+
+import pandas as pd
+
+from app import FinancialAIAnalyzer, app
+from benchmark import gerar_payload
+
+warnings.filterwarnings('ignore')
+
+def payload_sem_categoria():
+    """Livro-caixa com saídas sem categoria (null), que analyze_patterns_ml ignora"""
+    payload = gerar_payload(150, seed=3, meses=6)
+    for i, t in enumerate(payload['transacoes']):
+        if t['tipo'] == 'saida' and i % 7 == 0:
+            t['categoria'] = None
+    return payload
+
+def payload_valor_nulo():
+    """Saída com valor null (parseFloat vazio no frontend vira NaN e depois null no JSON)"""
+    return {
+        'transacoes': [
+            {'id': 1, 'tipo': 'saida', 'valor': 100, 'data': '2024-01-10', 'categoria': 'Material'},
+            {'id': 2, 'tipo': 'saida', 'valor': None, 'data': '2024-02-10', 'categoria': 'Material'},
+            {'id': 3, 'tipo': 'entrada', 'valor': 500, 'data': '2024-03-10', 'categoria': 'Receitas'},
+            {'id': 4, 'tipo': 'saida', 'valor': 120, 'data': '2024-03-15', 'categoria': 'Material'}
+        ],
+        'dividas': [],
+        'saldo_atual': 280,
+        'total_dividas': 0
+    }
+
+def casos():
+    """(payload, saldo_atual, total_dividas) sintéticos variando tamanho, período, saldo e dívidas"""
+    for seed in range(16):
+        rng = random.Random(seed)
+        payload = gerar_payload(rng.choice([1, 5, 30, 150, 400]), seed=seed, meses=rng.choice([1, 3, 8, 14]))
+        saldo = rng.choice([-500, 300, 1500, 4000, 9000, payload['saldo_atual']])
+        yield payload, saldo, rng.choice([0, 800, 5000, 20000])
+
+    yield payload_sem_categoria(), 2500, 5000
+    yield payload_valor_nulo(), 280, 0
+
+def divergencias(payload, saldo_atual, total_dividas):
+    """Meses em que a série difere do score calculado sobre os dados truncados no fim do mês"""
+    analyzer = FinancialAIAnalyzer()
+    df_trans, _ = analyzer.prepare_dataframe(payload['transacoes'], [])
+    serie = analyzer.calculate_health_series_ml(df_trans, saldo_atual, total_dividas)
+
+    diferentes = []
+    for ponto in serie:
+        ate_mes = df_trans[df_trans['data'] <= pd.Period(ponto['mes']).end_time]
+        padroes = analyzer.analyze_patterns_ml(ate_mes)
+        esperado = analyzer.calculate_financial_health_ml(ate_mes, padroes, ponto['saldo'], total_dividas)
+        if esperado != ponto['saudeFinanceira']:
+            diferentes.append((ponto['mes'], ponto['saudeFinanceira'], esperado))
+    return serie, diferentes
+
+def test_serie_igual_ao_calculo_mes_a_mes():
+    for payload, saldo, dividas in casos():
+        serie, diferentes = divergencias(payload, saldo, dividas)
+        assert not diferentes, diferentes
+        assert abs(serie[-1]['saldo'] - saldo) < 1e-6
+
+def test_analyze_aceita_saida_sem_categoria():
+    response = app.test_client().post('/api/analyze', json=payload_sem_categoria())
+    assert response.status_code == 200
+    resultado = response.get_json()
+    assert resultado['sucesso']
+    assert resultado['historicoSaudeFinanceira'][-1]['saudeFinanceira'] == resultado['saudeFinanceira']
+
+def rejeitar_constante(nome):
+    raise ValueError(f'JSON inválido para o navegador: {nome}')
+
+def test_analyze_aceita_valor_nulo():
+    response = app.test_client().post('/api/analyze', json=payload_valor_nulo())
+    assert response.status_code == 200
+    # Corpo precisa ser JSON válido para o navegador: NaN/Infinity são rejeitados
+    resultado = json.loads(response.get_data(as_text=True), parse_constant=rejeitar_constante)
+    for ponto in resultado['historicoSaudeFinanceira']:
+        assert 0 <= ponto['saudeFinanceira'] <= 100
+        assert all(math.isfinite(ponto[campo]) for campo in ('saldo', 'entradasAcumuladas', 'saidasAcumuladas'))
+    assert resultado['historicoSaudeFinanceira'][-1]['saudeFinanceira'] == resultado['saudeFinanceira']
+
+if __name__ == '__main__':
+    print("🚀 Teste do Histórico de Saúde Financeira")
+    print("=" * 60)
+    test_serie_igual_ao_calculo_mes_a_mes()
+    print("✅ Série idêntica ao cálculo mês a mês")
+    test_analyze_aceita_saida_sem_categoria()
+    print("✅ /api/analyze aceita saídas sem categoria")
+    test_analyze_aceita_valor_nulo()
+    print("✅ /api/analyze aceita valores nulos")
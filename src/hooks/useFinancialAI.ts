@@ -2,6 +2,8 @@ import { useState, useEffect } from 'react';
 import { supabase } from '../utils/supabaseClient';
 import {
   analisarFinancasComML,
+  agendarAnaliseML,
+  buscarAnaliseRecenteML,
   verificarHealthML,
   converterTransacoesParaML,
   converterGastosParaML,
@@ -9,8 +11,13 @@ import {
   type InsightML,
   type PrevisaoFluxo,
   type AnaliseComportamento,
+  type ResultadoAnaliseML,
 } from '../services/mlApiService';
 
+// Polling do resultado recalculado em segundo plano
+const INTERVALO_POLLING_MS = 1500;
+const MAX_TENTATIVAS_POLLING = 20;
+
 interface Transaction {
   id: string;
   tipo: 'entrada' | 'saida';
@@ -66,6 +73,32 @@ export const useFinancialAI = () => {
     loadAndAnalyze();
   }, []);
 
+  const aplicarResultado = (resultado: ResultadoAnaliseML) => {
+    setData({
+      padroesPorCategoria: resultado.padroesPorCategoria,
+      insights: resultado.insights,
+      previsaoFluxoCaixa: resultado.previsaoFluxoCaixa,
+      analiseComportamento: resultado.analiseComportamento,
+      saudeFinanceira: resultado.saudeFinanceira,
+      recomendacoes: resultado.recomendacoes,
+      loading: false,
+    });
+  };
+
+  // Acompanha o recálculo agendado até o backend terminar (pendente = false)
+  const acompanharRecalculo = async (tenantId: string, atualizadoEm?: string) => {
+    for (let tentativa = 0; tentativa < MAX_TENTATIVAS_POLLING; tentativa++) {
+      await new Promise(resolve => setTimeout(resolve, INTERVALO_POLLING_MS));
+      const recente = await buscarAnaliseRecenteML(tenantId);
+      if (recente && !recente.pendente) {
+        if (recente.atualizadoEm !== atualizadoEm) {
+          aplicarResultado(recente);
+        }
+        return;
+      }
+    }
+  };
+
   const loadAndAnalyze = async () => {
     try {
       setData(prev => ({ ...prev, loading: true }));
@@ -99,6 +132,21 @@ export const useFinancialAI = () => {
         return;
       }
 
+      // Resultados ficam guardados por usuário (as políticas RLS definem o que cada um vê)
+      const { data: { user } } = await supabase.auth.getUser();
+      const tenantId = user?.id;
+
+      // Exibir imediatamente o último resultado pré-calculado, se houver
+      let emCache: ResultadoAnaliseML | null = null;
+      if (tenantId) {
+        try {
+          emCache = await buscarAnaliseRecenteML(tenantId);
+          if (emCache) aplicarResultado(emCache);
+        } catch (error) {
+          console.warn('Análise pré-calculada indisponível:', error);
+        }
+      }
+
       // Carregar dados dos últimos 12 meses
       const dataInicio = new Date();
       dataInicio.setMonth(dataInicio.getMonth() - 12);
@@ -147,12 +195,28 @@ export const useFinancialAI = () => {
 
       // Usar API ML (obrigatório)
       const transacoesML = converterTransacoesParaML(transacoesData);
+
+      // Já exibindo o cache: enviar os dados atuais para recálculo em segundo plano
+      // (o backend ignora se nada mudou) e atualizar a tela quando terminar
+      if (tenantId && emCache) {
+        try {
+          await agendarAnaliseML(tenantId, transacoesML, saldoAtual, totalDividas, dividasData);
+          acompanharRecalculo(tenantId, emCache.atualizadoEm).catch(error =>
+            console.warn('Erro ao acompanhar recálculo ML:', error)
+          );
+        } catch (error) {
+          console.warn('Erro ao agendar recálculo ML (mantendo resultado em cache):', error);
+        }
+        return;
+      }
+
       const resultado = await analisarFinancasComML(
         transacoesML, 
         [], // Não enviar gastos de obras
         saldoAtual,
         totalDividas,
-        dividasData
+        dividasData,
+        tenantId
       );
       
       if (!resultado.sucesso) {
@@ -160,15 +224,7 @@ export const useFinancialAI = () => {
       }
 
       // Atualizar estado com resultados
-      setData({
-        padroesPorCategoria: resultado.padroesPorCategoria,
-        insights: resultado.insights,
-        previsaoFluxoCaixa: resultado.previsaoFluxoCaixa,
-        analiseComportamento: resultado.analiseComportamento,
-        saudeFinanceira: resultado.saudeFinanceira,
-        recomendacoes: resultado.recomendacoes,
-        loading: false,
-      });
+      aplicarResultado(resultado);
     } catch (error) {
       console.error('Erro na análise financeira:', error);
       setData(prev => ({
@@ -5,6 +5,18 @@
 
 const ML_API_URL = 'http://localhost:5000';
 
+// Necessário apenas se o backend ML estiver configurado com ML_API_TOKEN
+const ML_API_TOKEN = import.meta.env.VITE_ML_API_TOKEN as string | undefined;
+
+/**
+ * Cabeçalhos dos endpoints que guardam resultados por tenant
+ */
+function cabecalhosTenant(tenantId: string): Record<string, string> {
+  const headers: Record<string, string> = { 'X-Tenant-Id': tenantId };
+  if (ML_API_TOKEN) headers['X-Api-Token'] = ML_API_TOKEN;
+  return headers;
+}
+
 export interface TransacaoML {
   id: number;
   data: string;
@@ -62,15 +74,28 @@ export interface AnaliseComportamento {
   saldoAtual?: number;
 }
 
+export interface PontoSaudeFinanceira {
+  mes: string;
+  saudeFinanceira: number;
+  saldo: number;
+  entradasAcumuladas: number;
+  saidasAcumuladas: number;
+}
+
 export interface ResultadoAnaliseML {
   padroesPorCategoria: PadraoCategoria[];
   insights: InsightML[];
   previsaoFluxoCaixa: PrevisaoFluxo[];
   analiseComportamento: AnaliseComportamento;
   saudeFinanceira: number;
+  historicoSaudeFinanceira?: PontoSaudeFinanceira[];
   recomendacoes: string[];
   sucesso: boolean;
   erro?: string;
+  atualizadoEm?: string;
+  erroAtualizacao?: string | null;
+  tenantId?: string;
+  pendente?: boolean;
 }
 
 /**
@@ -114,13 +139,15 @@ export async function verificarHealthML(): Promise<boolean> {
  * @param saldoAtual - Saldo atual do caixa
  * @param totalDividas - Total de dívidas ativas
  * @param dividas - Lista de dívidas
+ * @param tenantId - Se informado, o backend guarda o resultado para /api/analyze/latest
  */
 export async function analisarFinancasComML(
   transacoes: TransacaoML[],
   gastos_obras: GastoObraML[] = [],
   saldoAtual?: number,
   totalDividas?: number,
-  dividas?: any[]
+  dividas?: any[],
+  tenantId?: string
 ): Promise<ResultadoAnaliseML> {
   try {
     // Timeout de 10 segundos para análise
@@ -131,6 +158,7 @@ export async function analisarFinancasComML(
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        ...(tenantId ? cabecalhosTenant(tenantId) : {}),
       },
       body: JSON.stringify({
         transacoes,
@@ -162,6 +190,69 @@ export async function analisarFinancasComML(
   }
 }
 
+/**
+ * Busca o último resultado pré-calculado em segundo plano pela API ML
+ * @param tenantId - Identificador do tenant
+ * @param refresh - Agenda um recálculo com os últimos dados enviados
+ * @returns null se ainda não houver análise pronta
+ */
+export async function buscarAnaliseRecenteML(
+  tenantId: string,
+  refresh: boolean = false
+): Promise<ResultadoAnaliseML | null> {
+  const params = new URLSearchParams({ tenant_id: tenantId });
+  if (refresh) params.set('refresh', '1');
+  
+  const response = await fetch(`${ML_API_URL}/api/analyze/latest?${params}`, {
+    headers: cabecalhosTenant(tenantId),
+  });
+  
+  if (response.status === 404) {
+    return null;
+  }
+  
+  if (!response.ok) {
+    throw new Error(`Erro na API ML: ${response.status} ${response.statusText}`);
+  }
+  
+  const resultado: ResultadoAnaliseML = await response.json();
+  
+  if (!resultado.sucesso) {
+    throw new Error(resultado.erro || 'Erro desconhecido na análise ML');
+  }
+  
+  return resultado;
+}
+
+/**
+ * Envia dados novos para a API ML recalcular a análise em segundo plano
+ */
+export async function agendarAnaliseML(
+  tenantId: string,
+  transacoes: TransacaoML[],
+  saldoAtual?: number,
+  totalDividas?: number,
+  dividas?: any[]
+): Promise<void> {
+  const response = await fetch(`${ML_API_URL}/api/analyze/dados`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...cabecalhosTenant(tenantId),
+    },
+    body: JSON.stringify({
+      transacoes,
+      saldo_atual: saldoAtual,
+      total_dividas: totalDividas,
+      dividas: dividas || [],
+    }),
+  });
+  
+  if (!response.ok) {
+    throw new Error(`Erro na API ML: ${response.status} ${response.statusText}`);
+  }
+}
+
 /**
  * Converte transações do Supabase para formato ML
  */